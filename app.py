@@ -6,6 +6,8 @@ import sys
 import io
 from typing import Any
 import folium
+from portal import ItemPager, PortalClient
+from preflight import CodeRejectedError, preflight_generated_code
 
 # --- 1. PRO CONFIGURATION ---
 st.set_page_config(
@@ -48,7 +50,14 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# --- 3. MOCK LLM (Demo Mode - No External Dependencies) ---
+# --- 3. PORTAL CLIENT (Deadlines + Circuit Breaker) ---
+
+@st.cache_resource
+def get_portal():
+    """Initialize the shared ArcGIS Online client"""
+    return PortalClient()
+
+# --- 4. MOCK LLM (Demo Mode - No External Dependencies) ---
 
 class MockResponse:
     """Mock response object to match LangChain interface"""
@@ -261,20 +270,15 @@ for item in items:
         """Create a wildfire map with real ArcGIS data"""
         m = folium.Map(location=[37.5, -119.5], zoom_start=6)
         
-        try:
-            # Fetch real wildfire data from ArcGIS Online
-            gis = GIS()
-            wildfire_search = gis.content.search("wildfire OR fire risk OR burn area", max_items=3)
-            
-            if wildfire_search:
-                for item in wildfire_search:
-                    folium.Marker(
-                        location=[37.5, -119.5],
-                        popup=f"<b>{item.title}</b><br>Type: {item.type}<br>Owner: {item.owner}",
-                        icon=folium.Icon(color="red", icon="fire")
-                    ).add_to(m)
-        except:
-            pass
+        # Fetch real wildfire data from ArcGIS Online ([] when the portal is down)
+        wildfire_search = get_portal().search("wildfire OR fire risk OR burn area", max_items=3)
+        
+        for item in wildfire_search:
+            folium.Marker(
+                location=[37.5, -119.5],
+                popup=f"<b>{item.title}</b><br>Type: {item.type}<br>Owner: {item.owner}",
+                icon=folium.Icon(color="red", icon="fire")
+            ).add_to(m)
         
         # Add wildfire risk zones (fallback if API fails)
         wildfire_zones = [
@@ -302,23 +306,18 @@ for item in items:
         """Create a weather map with real ArcGIS weather data"""
         m = folium.Map(location=[40, -95], zoom_start=4)
         
-        try:
-            # Fetch real weather data from ArcGIS Online
-            gis = GIS()
-            weather_search = gis.content.search("weather OR climate OR meteorological OR atmospheric", max_items=3)
-            
-            if weather_search:
-                for idx, item in enumerate(weather_search):
-                    # Distribute markers across the map
-                    lat = 40 + (idx * 5)
-                    lon = -95 + (idx * 10)
-                    folium.Marker(
-                        location=[lat, lon],
-                        popup=f"<b>{item.title}</b><br>Type: {item.type}",
-                        icon=folium.Icon(color="blue", icon="cloud")
-                    ).add_to(m)
-        except:
-            pass
+        # Fetch real weather data from ArcGIS Online ([] when the portal is down)
+        weather_search = get_portal().search("weather OR climate OR meteorological OR atmospheric", max_items=3)
+        
+        for idx, item in enumerate(weather_search):
+            # Distribute markers across the map
+            lat = 40 + (idx * 5)
+            lon = -95 + (idx * 10)
+            folium.Marker(
+                location=[lat, lon],
+                popup=f"<b>{item.title}</b><br>Type: {item.type}",
+                icon=folium.Icon(color="blue", icon="cloud")
+            ).add_to(m)
         
         # Add weather monitoring stations (fallback)
         stations = [
@@ -340,22 +339,17 @@ for item in items:
         """Create an infrastructure/transportation map with real data"""
         m = folium.Map(location=[39.8283, -98.5795], zoom_start=4)
         
-        try:
-            # Fetch real infrastructure data from ArcGIS Online
-            gis = GIS()
-            infra_search = gis.content.search("transportation OR highways OR roads OR traffic", max_items=3)
-            
-            if infra_search:
-                for idx, item in enumerate(infra_search):
-                    lat = 39 + (idx * 3)
-                    lon = -98 + (idx * 8)
-                    folium.Marker(
-                        location=[lat, lon],
-                        popup=f"<b>{item.title}</b><br>Type: {item.type}",
-                        icon=folium.Icon(color="green", icon="road")
-                    ).add_to(m)
-        except:
-            pass
+        # Fetch real infrastructure data from ArcGIS Online ([] when the portal is down)
+        infra_search = get_portal().search("transportation OR highways OR roads OR traffic", max_items=3)
+        
+        for idx, item in enumerate(infra_search):
+            lat = 39 + (idx * 3)
+            lon = -98 + (idx * 8)
+            folium.Marker(
+                location=[lat, lon],
+                popup=f"<b>{item.title}</b><br>Type: {item.type}",
+                icon=folium.Icon(color="green", icon="road")
+            ).add_to(m)
         
         # Add major highways (fallback)
         highways = [
@@ -397,27 +391,22 @@ for item in items:
         """Create a demographic/census map with real data"""
         m = folium.Map(location=[37.0, -95.0], zoom_start=3)
         
-        try:
-            # Fetch real demographic/census data from ArcGIS Online
-            gis = GIS()
-            demo_search = gis.content.search("demographic OR census OR population OR education", max_items=3)
-            
-            if demo_search:
-                for idx, item in enumerate(demo_search):
-                    lat = 37 + (idx * 5)
-                    lon = -95 + (idx * 15)
-                    folium.CircleMarker(
-                        location=[lat, lon],
-                        radius=15,
-                        popup=f"<b>{item.title}</b><br>Type: {item.type}",
-                        color="purple",
-                        fill=True,
-                        fillColor="purple",
-                        fillOpacity=0.6,
-                        weight=2
-                    ).add_to(m)
-        except:
-            pass
+        # Fetch real demographic/census data from ArcGIS Online ([] when the portal is down)
+        demo_search = get_portal().search("demographic OR census OR population OR education", max_items=3)
+        
+        for idx, item in enumerate(demo_search):
+            lat = 37 + (idx * 5)
+            lon = -95 + (idx * 15)
+            folium.CircleMarker(
+                location=[lat, lon],
+                radius=15,
+                popup=f"<b>{item.title}</b><br>Type: {item.type}",
+                color="purple",
+                fill=True,
+                fillColor="purple",
+                fillOpacity=0.6,
+                weight=2
+            ).add_to(m)
         
         # Add demographic zones (fallback)
         zones = [
@@ -461,14 +450,23 @@ if "last_map" not in st.session_state:
     st.session_state.last_map = None
 if "last_data_items" not in st.session_state:
     st.session_state.last_data_items = None
+if "item_pager" not in st.session_state:
+    st.session_state.item_pager = None
 
 def execute_arcgis_code(code_snippet):
+    # Pre-flight runs before any network I/O, so expensive code fails in milliseconds
+    try:
+        safe_code, notes = preflight_generated_code(code_snippet)
+    except CodeRejectedError as e:
+        return f"🛑 Pre-flight Rejected: {e}"
+    preflight_log = "".join(f"🛡️ Pre-flight: {note}\n" for note in notes)
+    
     captured_output = io.StringIO()
     sys.stdout = captured_output
     try:
         # Define the execution environment
-        exec_globals = {"arcgis": arcgis, "GIS": GIS}
-        exec(code_snippet, exec_globals)
+        exec_globals = {"arcgis": arcgis, "GIS": GIS, "portal_session": get_portal().session}
+        exec(safe_code, exec_globals)
         result = captured_output.getvalue()
         if not result:
             result = "✅ Command executed successfully (No text output)."
@@ -476,7 +474,7 @@ def execute_arcgis_code(code_snippet):
         result = f"❌ Execution Error: {e}"
     finally:
         sys.stdout = sys.__stdout__
-    return result
+    return preflight_log + result
 
 def clean_generated_code(text):
     """
@@ -508,39 +506,44 @@ def generate_and_run(user_input):
     map_obj = llm.generate_map()
     
     # Fetch real data from ArcGIS Online based on query type
-    data_items = fetch_real_data(llm.last_query_type)
+    item_pager = fetch_real_data(llm.last_query_type)
     
-    return clean_code, execute_arcgis_code(clean_code), map_obj, data_items
-
-def fetch_real_data(query_type: str):
-    """Fetch real data from ArcGIS Online based on query type"""
-    try:
-        gis = GIS()
-        
-        if query_type == "wildfire":
-            items = gis.content.search("wildfire OR fire risk OR burn area", max_items=5)
-        elif query_type == "weather":
-            items = gis.content.search("weather OR climate OR meteorological", max_items=5)
-        elif query_type == "infrastructure":
-            items = gis.content.search("transportation OR highways OR roads", max_items=5)
-        elif query_type == "realestate":
-            items = gis.content.search("real estate OR property OR housing", max_items=5)
-        elif query_type == "demographic":
-            items = gis.content.search("demographic OR census OR population", max_items=5)
-        else:
-            items = gis.content.search("geographic data", max_items=5)
-        
-        return items if items else []
-    except:
-        return []
+    return clean_code, execute_arcgis_code(clean_code), map_obj, item_pager
+
+def fetch_real_data(query_type: str) -> ItemPager:
+    """Open a paged ArcGIS Online search for the query type and load its first page"""
+    if query_type == "wildfire":
+        query = "wildfire OR fire risk OR burn area"
+    elif query_type == "weather":
+        query = "weather OR climate OR meteorological"
+    elif query_type == "infrastructure":
+        query = "transportation OR highways OR roads"
+    elif query_type == "realestate":
+        query = "real estate OR property OR housing"
+    elif query_type == "demographic":
+        query = "demographic OR census OR population"
+    else:
+        query = "geographic data"
+    
+    item_pager = ItemPager(get_portal(), query, page_size=5)
+    item_pager.load_more()
+    return item_pager
 
-# --- 4. LAYOUT ---
+# --- 5. LAYOUT ---
 with st.sidebar:
     st.markdown("### ⚡ ArcGIS Copilot")
     st.markdown("---")
     st.caption("SYSTEM STATUS")
     st.markdown("🟢 **Model:** Demo/Mock LLM (No External Dependencies)")
-    st.markdown("🟢 **API:** ArcGIS Online (Active)")
+    portal_status = get_portal().snapshot()
+    if portal_status["state"] == PortalClient.CLOSED:
+        st.markdown("🟢 **API:** ArcGIS Online (Active)")
+    elif portal_status["state"] == PortalClient.HALF_OPEN:
+        st.markdown("🟡 **API:** ArcGIS Online (Recovering)")
+    else:
+        st.markdown("🔴 **API:** ArcGIS Online (Offline - Fallback Data)")
+    with st.expander("📈 Portal Metrics"):
+        st.json(portal_status)
     st.markdown("---")
     st.info("💡 **Demo Mode**: Using mock code generation. Perfect for testing the workflow!")
     if st.button("🗑️ Reset"):
@@ -549,6 +552,7 @@ with st.sidebar:
         st.session_state.last_code = None
         st.session_state.last_map = None
         st.session_state.last_data_items = None
+        st.session_state.item_pager = None
         st.rerun()
 
 col1, col2 = st.columns([1, 1], gap="large")
@@ -567,11 +571,12 @@ with col1:
         
         with st.chat_message("assistant"):
             with st.spinner("Writing & Executing Code..."):
-                code, output, map_obj, data_items = generate_and_run(prompt)
+                code, output, map_obj, item_pager = generate_and_run(prompt)
                 st.session_state.last_code = code
                 st.session_state.last_result = output
                 st.session_state.last_map = map_obj
-                st.session_state.last_data_items = data_items
+                st.session_state.item_pager = item_pager
+                st.session_state.last_data_items = item_pager.items
                 st.write("Executed. See Workspace.")
                 st.session_state.messages.append({"role": "assistant", "content": "Executed. See Workspace."})
                 st.rerun()
@@ -592,15 +597,16 @@ with col2:
         map_html = st.session_state.last_map._repr_html_()
         st.components.v1.html(map_html, height=400)
         
-        # Display Data Items
-        if st.session_state.last_data_items:
+        # Display Data Items (also shown when the first page failed, so it can be retried)
+        item_pager = st.session_state.item_pager
+        if st.session_state.last_data_items or (item_pager and item_pager.has_more):
             st.markdown("""
             <div class="result-card">
                 <div class="result-title">📊 Found Data Items</div>
             </div>
             """, unsafe_allow_html=True)
             
-            for idx, item in enumerate(st.session_state.last_data_items[:5], 1):
+            for idx, item in enumerate(st.session_state.last_data_items, 1):
                 with st.expander(f"📌 {idx}. {item.title[:50]}..."):
                     col1, col2 = st.columns(2)
                     with col1:
@@ -610,6 +616,12 @@ with col2:
                         st.write(f"**ID:** {item.id[:20]}...")
                         if hasattr(item, 'modified'):
                             st.write(f"**Modified:** {item.modified}")
+            
+            # Next page is usually already prefetched, so this skips generation and map building
+            if item_pager and item_pager.has_more:
+                if st.button("⬇️ Load more"):
+                    item_pager.load_more()
+                    st.rerun()
         
         # Code Card
         st.markdown("""
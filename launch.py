@@ -2,43 +2,111 @@
 """
 Simple launcher for ArcGIS Copilot that handles Ollama connectivity
 """
+import json
+import os
 import subprocess
 import sys
 import time
 import requests
 
-def check_ollama():
-    """Check if Ollama server is running"""
+# Override these to point the launcher at another server (e.g. a local stub in tests)
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3")
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+def wait_for_ollama(base_url=OLLAMA_URL, timeout=30.0, interval=0.5):
+    """Poll /api/tags until the server answers, instead of sleeping a fixed time (timeout=0 probes once)"""
+    if timeout > 0:
+        print(f"⏳ Waiting up to {timeout:.0f}s for Ollama at {base_url}...")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = requests.get(f"{base_url}/api/tags", timeout=2)
+            if response.status_code == 200:
+                print("✅ Ollama server is ready")
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        if time.monotonic() + interval > deadline:
+            break
+        time.sleep(interval)
+    if timeout > 0:
+        print(f"❌ Ollama server did not become ready within {timeout:.0f}s")
+    else:
+        print(f"❌ Ollama server is NOT running on {base_url}")
+    return False
+
+def warm_model(base_url=OLLAMA_URL, model=OLLAMA_MODEL, keep_alive=OLLAMA_KEEP_ALIVE, timeout=120.0):
+    """
+    Preload the model so the first real prompt skips the 10-20s load.
+    Streams a one-token generation with keep_alive set and returns the
+    time to first token in seconds (None if the model could not be warmed).
+    """
+    print(f"🔥 Warming up '{model}' (keep_alive={keep_alive})...")
+    payload = {
+        "model": model,
+        "prompt": "Hi",
+        "stream": True,
+        "keep_alive": keep_alive,
+        "options": {"num_predict": 1},
+    }
+    started = time.monotonic()
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=2)
-        if response.status_code == 200:
-            print("✅ Ollama server is running")
-            return True
-    except requests.exceptions.ConnectionError:
-        print("❌ Ollama server is NOT running on localhost:11434")
-        return False
-    except Exception as e:
-        print(f"⚠️  Error checking Ollama: {e}")
+        with requests.post(f"{base_url}/api/generate", json=payload, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                print(f"❌ Could not load '{model}' (HTTP {response.status_code})")
+                print(f"   Download it with: ollama pull {model}")
+                return None
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    print(f"❌ Could not load '{model}': {chunk['error']}")
+                    return None
+                if chunk.get("response") or chunk.get("done"):
+                    ttft = time.monotonic() - started
+                    print(f"✅ '{model}' is warm (time to first token: {ttft:.2f}s)")
+                    return ttft
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"⚠️  Error warming up '{model}': {e}")
+        return None
+    print(f"❌ '{model}' returned no tokens")
+    return None
+
+def prepare_ollama(base_url=OLLAMA_URL, model=OLLAMA_MODEL, keep_alive=OLLAMA_KEEP_ALIVE, wait_timeout=30.0):
+    """Readiness stage: wait for the server, then preload the model. Returns True when warm."""
+    if not wait_for_ollama(base_url, timeout=wait_timeout):
         return False
+    return warm_model(base_url, model, keep_alive) is not None
 
 def main():
     print("🚀 ArcGIS Copilot Launcher")
     print("=" * 50)
-    
-    # Check Ollama
-    if not check_ollama():
-        print("\n⚠️  Ollama is required but not running!")
+
+    warm_only = "--warm-only" in sys.argv
+
+    # Check Ollama and warm the model before the first prompt. Only --warm-only (run by
+    # start.sh right after it starts `ollama serve`) waits for the server to come up;
+    # a plain launch has nothing starting Ollama, so it probes once and moves on.
+    if not prepare_ollama(wait_timeout=30.0 if warm_only else 0):
+        print("\n⚠️  Ollama is required but not ready!")
         print("\nTo start Ollama:")
         print("  1. Install from https://ollama.ai")
         print("  2. Run: ollama serve")
-        print("  3. Download model: ollama pull llama3 (in another terminal)")
+        print(f"  3. Download model: ollama pull {OLLAMA_MODEL} (in another terminal)")
+        if warm_only:
+            sys.exit(1)
         print("\nContinuing without Ollama - the app will show an error message.")
-    
+
+    if warm_only:
+        return
+
     # Start Streamlit
     port = "8502"  # Use 8502 if 8501 is already in use
     print(f"\n🎬 Starting Streamlit app on http://localhost:{port}")
     print("=" * 50)
-    
+
     subprocess.run([
         sys.executable, "-m", "streamlit", "run",
         "/workspaces/arcgis-copilot-poc/app.py",
@@ -0,0 +1,334 @@
+"""
+Resilient ArcGIS Online access: deadlines, hedged retries, and a circuit breaker
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
+from typing import Any
+
+def anonymous_gis(timeout: float) -> Any:
+    """Open an anonymous ArcGIS Online session with a per-request timeout"""
+    # Imported here so the client can be exercised without the arcgis package
+    from arcgis.gis import GIS
+    return GIS(timeout=timeout)
+
+class PortalUnavailableError(Exception):
+    """Raised when ArcGIS Online is down, slow, or the circuit breaker is open"""
+
+class PortalClient:
+    """
+    Wraps every ArcGIS Online call so an offline portal costs milliseconds, not timeouts:
+    1. Per-call deadline - a call that has not answered in time is abandoned, and the
+       session's own request timeout ends the abandoned work near that deadline.
+    2. Hedged retry - a slow call gets a second, parallel attempt; first answer wins.
+    3. Circuit breaker - after repeated failures, calls fail fast until a cool-down passes.
+    Work is never queued behind busy workers: with no worker free, a call fails fast.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, deadline: float = 4.0, hedge_after: float = 1.5,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0, max_workers: int = 8,
+                 connect=None):
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_workers = max_workers
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._in_flight = 0
+        self._gis = None
+        self._connect = connect or anonymous_gis
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="portal")
+        # Prefetches run inline on their own pool and never count toward the breaker
+        self._background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="portal-prefetch")
+        self.metrics = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "hedged": 0,
+            "short_circuited": 0,
+            "saturated": 0,
+            "abandoned": 0,
+            "background_failures": 0,
+            "transitions": {},
+            "last_transition": None,
+        }
+
+    def search(self, query: str, **kwargs) -> list:
+        """Search ArcGIS Online, returning [] (so callers use fallback data) on any failure"""
+        try:
+            items = self.call(lambda: self._connection().content.search(query, **kwargs))
+            return items if items else []
+        except PortalUnavailableError:
+            return []
+
+    def search_page(self, query: str, start: int, num: int, background: bool = False) -> tuple:
+        """
+        Fetch one page of search results using the portal's start/num paging.
+        Returns (items, next_start); next_start is -1 once results are exhausted.
+        Raises PortalUnavailableError so pagers can keep their cursor and retry.
+        """
+        fetch = lambda: self._connection().content.advanced_search(query, max_items=num, start=start)
+        page = self.call_background(fetch) if background else self.call(fetch)
+        return page.get("results", []), page.get("nextStart", -1)
+
+    def session(self) -> Any:
+        """Return the shared GIS session, connecting under the deadline and circuit breaker"""
+        return self.call(self._connection)
+
+    def submit_background(self, fn, *args, **kwargs):
+        """Run fn on the background pool (used for prefetching)"""
+        return self._background.submit(fn, *args, **kwargs)
+
+    def call_background(self, fn) -> Any:
+        """
+        Run a low-priority portal call inline on the calling background thread.
+        It is skipped unless the breaker is closed, is bounded by the session's request
+        timeout, and its failures never open the breaker for foreground calls.
+        """
+        with self._lock:
+            if self.state != self.CLOSED:
+                self.metrics["short_circuited"] += 1
+                raise PortalUnavailableError("ArcGIS Online circuit is not closed; skipping prefetch")
+        try:
+            return fn()
+        except Exception as e:
+            with self._lock:
+                self.metrics["background_failures"] += 1
+            raise PortalUnavailableError(f"ArcGIS Online prefetch failed: {e}") from e
+
+    def call(self, fn, *args, **kwargs) -> Any:
+        """Run a portal call under the deadline, hedging, and circuit breaker"""
+        if not self._allow_request():
+            with self._lock:
+                self.metrics["short_circuited"] += 1
+            raise PortalUnavailableError("ArcGIS Online circuit is open; using fallback data")
+
+        with self._lock:
+            self.metrics["calls"] += 1
+            # Half-open trials are not hedged so a hung portal can hold at most one worker
+            hedge = self.state == self.CLOSED
+        try:
+            result = self._run_hedged(fn, hedge, *args, **kwargs)
+        except PortalUnavailableError:
+            with self._lock:
+                self._trial_in_flight = False
+            raise
+        except Exception as e:
+            self._record_failure(timed_out=isinstance(e, TimeoutError))
+            raise PortalUnavailableError(f"ArcGIS Online call failed: {e}") from e
+        self._record_success()
+        return result
+
+    def snapshot(self) -> dict:
+        """Return a copy of the breaker state and metrics for display"""
+        with self._lock:
+            metrics = dict(self.metrics)
+            metrics["transitions"] = dict(self.metrics["transitions"])
+            metrics["state"] = self.state
+            metrics["in_flight"] = self._in_flight
+        return metrics
+
+    def _connection(self) -> Any:
+        """Lazily create one anonymous GIS session shared by all calls"""
+        with self._lock:
+            gis = self._gis
+        if gis is None:
+            # A real per-request timeout, so work abandoned at the deadline frees its worker
+            gis = self._connect(timeout=self.deadline)
+            with self._lock:
+                if self._gis is None:
+                    self._gis = gis
+                gis = self._gis
+        return gis
+
+    def _submit(self, fn, *args, **kwargs):
+        """Start fn on a free worker, or return None instead of queuing behind busy ones"""
+        with self._lock:
+            if self._in_flight >= self.max_workers:
+                return None
+            self._in_flight += 1
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._release_worker)
+        return future
+
+    def _release_worker(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _run_hedged(self, fn, hedge: bool, *args, **kwargs) -> Any:
+        """Run fn, launching a second attempt if the first is slow, bounded by the deadline"""
+        deadline_at = time.monotonic() + self.deadline
+        first = self._submit(fn, *args, **kwargs)
+        if first is None:
+            with self._lock:
+                self.metrics["saturated"] += 1
+            raise PortalUnavailableError("all portal workers are busy with stalled calls; using fallback data")
+        futures = [first]
+
+        done, _ = wait(futures, timeout=min(self.hedge_after, self.deadline))
+        # Only hedge when there is time left for the second attempt to answer
+        if not done and hedge and self.hedge_after < self.deadline:
+            second = self._submit(fn, *args, **kwargs)
+            if second is not None:
+                with self._lock:
+                    self.metrics["hedged"] += 1
+                futures.append(second)
+
+        error = None
+        while futures:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+            futures = list(pending)
+
+        if error is not None and not futures:
+            raise error
+        # Running threads cannot be cancelled; they end at the session's request timeout
+        abandoned = sum(1 for future in futures if not future.done())
+        with self._lock:
+            self.metrics["abandoned"] += abandoned
+        raise TimeoutError(f"no answer within {self.deadline:.1f}s")
+
+    def _allow_request(self) -> bool:
+        """Decide whether a call may go out, moving OPEN -> HALF_OPEN after the cool-down"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._transition(self.HALF_OPEN)
+            # HALF_OPEN: let exactly one trial call through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def _record_success(self):
+        with self._lock:
+            self.metrics["successes"] += 1
+            self._failures = 0
+            self._trial_in_flight = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def _record_failure(self, timed_out: bool):
+        with self._lock:
+            self.metrics["failures"] += 1
+            if timed_out:
+                self.metrics["timeouts"] += 1
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self.state != self.OPEN:
+                    self._transition(self.OPEN)
+
+    def _transition(self, new_state: str):
+        """Move to new_state and count the transition (caller holds the lock)"""
+        key = f"{self.state}->{new_state}"
+        self.metrics["transitions"][key] = self.metrics["transitions"].get(key, 0) + 1
+        self.metrics["last_transition"] = {"transition": key, "at": time.time()}
+        self.state = new_state
+
+class ItemPager:
+    """
+    Cursor-based pager over ArcGIS Online search results.
+    After each page is served, the next one is prefetched in the background into a
+    bounded buffer, so "Load more" is usually instant and never re-runs generation.
+    """
+
+    def __init__(self, portal: PortalClient, query: str, page_size: int = 5, buffer_pages: int = 2):
+        self.portal = portal
+        self.query = query
+        self.page_size = page_size
+        self.buffer_pages = buffer_pages
+        self.items = []
+        self._buffer = deque()
+        self._next_start = 1
+        self._exhausted = False
+        self._prefetch = None
+        self._lock = threading.Lock()
+
+    @property
+    def has_more(self) -> bool:
+        with self._lock:
+            return bool(self._buffer) or not self._exhausted
+
+    def load_more(self) -> list:
+        """Append the next page to self.items and return it ([] if none is available)"""
+        # Only one fetch may move the cursor at a time, so wait for an in-flight prefetch
+        with self._lock:
+            pending = self._prefetch
+        if pending is not None:
+            if pending.cancel():
+                # Still queued behind other sessions' prefetches: fetch in the foreground instead
+                with self._lock:
+                    if self._prefetch is pending:
+                        self._prefetch = None
+            else:
+                try:
+                    pending.result(timeout=self.portal.deadline)
+                except FutureTimeoutError:
+                    # The running prefetch will still land in the buffer for the next click
+                    return []
+
+        with self._lock:
+            page = self._buffer.popleft() if self._buffer else None
+        if page is None:
+            page = self._fetch_next()
+
+        self.items.extend(page)
+        self._schedule_prefetch()
+        return page
+
+    def _fetch_next(self, background: bool = False) -> list:
+        """Fetch the page at the cursor and advance it; on failure keep the cursor for a retry"""
+        with self._lock:
+            if self._exhausted:
+                return []
+            start = self._next_start
+        try:
+            page, next_start = self.portal.search_page(self.query, start, self.page_size, background)
+        except PortalUnavailableError:
+            return []
+        with self._lock:
+            self._next_start = next_start
+            self._exhausted = next_start is None or next_start < 1 or not page
+        return page
+
+    def _prefetch_into_buffer(self):
+        page = []
+        try:
+            page = self._fetch_next(background=True)
+        finally:
+            # Buffer the page before clearing _prefetch so load_more never skips past it
+            with self._lock:
+                if page:
+                    self._buffer.append(page)
+                self._prefetch = None
+
+    def _schedule_prefetch(self):
+        with self._lock:
+            if self._prefetch is not None or self._exhausted or len(self._buffer) >= self.buffer_pages:
+                return
+            self._prefetch = self.portal.submit_background(self._prefetch_into_buffer)
@@ -0,0 +1,283 @@
+"""
+Cost-aware pre-flight for LLM-generated ArcGIS code, run before exec
+"""
+import ast
+
+class CodeRejectedError(Exception):
+    """Raised when pre-flight analysis finds generated code too expensive to run"""
+
+class PortalCostAnalyzer(ast.NodeTransformer):
+    """
+    Estimates the ArcGIS Online cost of a generated snippet and makes it cheap to run:
+    1. Caps unbounded or oversized max_items / feature query record counts.
+    2. Multiplies each portal call by the size of the loops around it.
+    3. Rewrites GIS(...) to the shared portal session.
+    Call reject() after visiting to raise on known-expensive patterns.
+    """
+
+    MAX_ITEMS_CAP = 25
+    QUERY_RECORD_CAP = 1000
+    COST_BUDGET = 50
+    UNBOUNDED_LOOP = 10000
+    SEARCH_DEFAULT_ITEMS = {"search": 10, "advanced_search": 100}
+    PORTAL_METHODS = {"search", "advanced_search", "query", "query_related_records"}
+    PORTAL_ATTRIBUTES = {"layers", "tables"}
+    BULK_METHODS = {"download", "export", "export_data"}
+    FEATURE_QUERY_KEYWORDS = {
+        "where", "out_fields", "return_geometry", "geometry_filter",
+        "result_record_count", "return_all_records", "result_offset",
+    }
+    DATAFRAME_NAMES = {"df", "sdf"}
+    DATAFRAME_ATTRIBUTES = {"sdf", "df"}
+    DATAFRAME_CONSTRUCTORS = {
+        "DataFrame", "read_csv", "read_excel", "read_json", "read_parquet",
+        "from_layer", "from_featureclass", "from_df",
+    }
+
+    def __init__(self):
+        self.cost = 0
+        self.notes = []
+        self.problems = []
+        self._multiplier = 1
+        self._sizes = {}
+        self._call_sizes = {}
+        self._frames = set()
+
+    def reject(self):
+        """Raise CodeRejectedError if the visited snippet is known to be expensive"""
+        if self.cost > self.COST_BUDGET:
+            self.problems.append(
+                f"estimated {self.cost} portal calls exceeds the budget of {self.COST_BUDGET}"
+            )
+        if self.problems:
+            raise CodeRejectedError("; ".join(self.problems))
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = node.func
+        name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+        
+        if name == "GIS":
+            self.notes.append("GIS(...) rewritten to the shared portal session")
+            return ast.copy_location(
+                ast.Call(func=ast.Name(id="portal_session", ctx=ast.Load()), args=[], keywords=[]),
+                node,
+            )
+        if not isinstance(func, ast.Attribute):
+            return node
+        if name in self.BULK_METHODS:
+            self.problems.append(f"bulk .{name}() transfers are not allowed in generated code")
+        elif name in ("search", "advanced_search"):
+            self._expand_splats(node, name)
+            self._call_sizes[id(node)] = self._cap_keyword(
+                node, "max_items", self.MAX_ITEMS_CAP, self.SEARCH_DEFAULT_ITEMS[name]
+            )
+            self._charge(name)
+        elif name == "query" and self._is_dataframe_query(node):
+            return node
+        elif name == "query":
+            self._expand_splats(node, name)
+            self._cap_feature_query(node)
+            self._call_sizes[id(node)] = self.QUERY_RECORD_CAP
+            self._charge(name)
+        elif name in self.PORTAL_METHODS:
+            self._charge(name)
+        elif name == "get" and isinstance(func.value, ast.Attribute) and func.value.attr == "content":
+            # gis.content.get(id) is one portal round trip; dict.get is left alone
+            self._charge("content.get")
+        return node
+
+    def visit_Attribute(self, node):
+        self.generic_visit(node)
+        if node.attr in self.PORTAL_ATTRIBUTES and isinstance(node.ctx, ast.Load):
+            self._charge(node.attr)
+        return node
+
+    def visit_Assign(self, node):
+        self.generic_visit(node)
+        size = self._iter_size(node.value)
+        is_frame = self._is_dataframe(node.value)
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                if is_frame:
+                    self._frames.add(target.id)
+                else:
+                    self._frames.discard(target.id)
+                if size is None:
+                    self._sizes.pop(target.id, None)
+                else:
+                    self._sizes[target.id] = size
+        return node
+
+    def visit_For(self, node):
+        node.iter = self.visit(node.iter)
+        node.target = self.visit(node.target)
+        self._visit_loop_body(node, node.body, self._iter_size(node.iter))
+        node.orelse = [self.visit(stmt) for stmt in node.orelse]
+        return node
+
+    visit_AsyncFor = visit_For
+
+    def visit_While(self, node):
+        node.test = self.visit(node.test)
+        self._visit_loop_body(node, node.body, None)
+        node.orelse = [self.visit(stmt) for stmt in node.orelse]
+        return node
+
+    def _visit_comprehension(self, node):
+        outer = self._multiplier
+        for generator in node.generators:
+            generator.iter = self.visit(generator.iter)
+            size = self._iter_size(generator.iter)
+            self._multiplier *= size if size is not None else self.UNBOUNDED_LOOP
+            generator.ifs = [self.visit(condition) for condition in generator.ifs]
+        for field in ("elt", "key", "value"):
+            if hasattr(node, field):
+                setattr(node, field, self.visit(getattr(node, field)))
+        self._multiplier = outer
+        return node
+
+    visit_ListComp = visit_SetComp = visit_GeneratorExp = visit_DictComp = _visit_comprehension
+
+    def _visit_loop_body(self, node, body, size):
+        outer = self._multiplier
+        self._multiplier *= size if size is not None else self.UNBOUNDED_LOOP
+        node.body = [self.visit(stmt) for stmt in body]
+        self._multiplier = outer
+
+    def _charge(self, name: str):
+        """Count one portal call, scaled by the loops around it"""
+        self.cost += self._multiplier
+        if self._multiplier > self.COST_BUDGET:
+            problem = f".{name} called inside an unbounded or per-feature loop"
+            if problem not in self.problems:
+                self.problems.append(problem)
+
+    def _expand_splats(self, node, name: str):
+        """
+        Inline literal **{...} keyword splats so their limits can be capped; any other
+        splat could hide max_items or record counts, so the snippet is rejected.
+        """
+        keywords = []
+        for kw in node.keywords:
+            if kw.arg is not None:
+                keywords.append(kw)
+            elif isinstance(kw.value, ast.Dict) and all(
+                isinstance(key, ast.Constant) and isinstance(key.value, str) for key in kw.value.keys
+            ):
+                keywords.extend(
+                    ast.copy_location(ast.keyword(arg=key.value, value=value), kw)
+                    for key, value in zip(kw.value.keys, kw.value.values)
+                )
+                self.notes.append(f"**{{...}} keywords inlined on .{name}()")
+            else:
+                self.problems.append(f"**kwargs on .{name}() can hide unbounded limits")
+        node.keywords = keywords
+
+    def _cap_keyword(self, node, keyword: str, cap: int, default: int) -> int:
+        """Clamp a numeric keyword to cap, adding it when the default is above the cap"""
+        for kw in node.keywords:
+            if kw.arg != keyword:
+                continue
+            value = kw.value
+            if isinstance(value, ast.Constant) and isinstance(value.value, int) and 0 < value.value <= cap:
+                return value.value
+            if isinstance(value, ast.Constant):
+                self.notes.append(f"{keyword}={value.value!r} capped to {cap}")
+                kw.value = ast.copy_location(ast.Constant(cap), value)
+            else:
+                self.notes.append(f"{keyword}={ast.unparse(value)} wrapped in min(..., {cap})")
+                kw.value = ast.copy_location(
+                    ast.Call(func=ast.Name(id="min", ctx=ast.Load()), args=[value, ast.Constant(cap)], keywords=[]),
+                    value,
+                )
+            return cap
+        if default > cap:
+            self.notes.append(f"{keyword}={cap} added (default is {default})")
+            node.keywords.append(ast.keyword(arg=keyword, value=ast.Constant(cap)))
+            return cap
+        return default
+
+    def _is_dataframe_query(self, node) -> bool:
+        """
+        True only for calls that are clearly DataFrame.query(expr). FeatureLayer.query
+        takes `where` as its first positional argument, so anything ambiguous is capped.
+        """
+        if any(kw.arg in self.FEATURE_QUERY_KEYWORDS for kw in node.keywords):
+            return False
+        if any(kw.arg == "expr" for kw in node.keywords):
+            return True
+        return self._is_dataframe(node.func.value)
+
+    def _is_dataframe(self, node) -> bool:
+        """Best-effort check that an expression evaluates to a (spatially enabled) DataFrame"""
+        if isinstance(node, ast.Name):
+            return node.id in self._frames or node.id in self.DATAFRAME_NAMES or node.id.endswith("_df")
+        if isinstance(node, ast.Attribute):
+            return node.attr in self.DATAFRAME_ATTRIBUTES
+        if isinstance(node, ast.Subscript):
+            return self._is_dataframe(node.value)
+        if isinstance(node, ast.Call):
+            func = node.func
+            name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+            if name in self.DATAFRAME_CONSTRUCTORS:
+                return True
+            # Most DataFrame methods (head, dropna, query, ...) return another DataFrame
+            return isinstance(func, ast.Attribute) and self._is_dataframe(func.value)
+        return False
+
+    def _cap_feature_query(self, node):
+        """Stop a feature query from paging through every record in the layer"""
+        if any(kw.arg == "return_count_only" for kw in node.keywords):
+            return
+        self._cap_keyword(node, "result_record_count", self.QUERY_RECORD_CAP, self.UNBOUNDED_LOOP)
+        for kw in node.keywords:
+            if kw.arg == "return_all_records":
+                if not (isinstance(kw.value, ast.Constant) and kw.value.value is False):
+                    self.notes.append("return_all_records disabled")
+                    kw.value = ast.copy_location(ast.Constant(False), kw.value)
+                return
+        node.keywords.append(ast.keyword(arg="return_all_records", value=ast.Constant(False)))
+
+    def _iter_size(self, node):
+        """Best-effort upper bound on how many items an expression yields (None if unknown)"""
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            return len(node.elts)
+        if isinstance(node, ast.Name):
+            return self._sizes.get(node.id)
+        if isinstance(node, ast.Attribute) and node.attr == "features":
+            return self._iter_size(node.value)
+        if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice):
+            upper = node.slice.upper
+            inner = self._iter_size(node.value)
+            if isinstance(upper, ast.Constant) and isinstance(upper.value, int) and upper.value >= 0:
+                return upper.value if inner is None else min(upper.value, inner)
+            return inner
+        if isinstance(node, ast.Call):
+            if id(node) in self._call_sizes:
+                return self._call_sizes[id(node)]
+            func_name = getattr(node.func, "id", None)
+            if func_name == "range" and node.args and all(
+                isinstance(arg, ast.Constant) and isinstance(arg.value, int) for arg in node.args
+            ):
+                return len(range(*(arg.value for arg in node.args)))
+            if func_name in ("enumerate", "list", "sorted", "reversed", "tuple") and node.args:
+                return self._iter_size(node.args[0])
+        return None
+
+def preflight_generated_code(code_snippet: str) -> tuple:
+    """
+    Cost-aware pre-flight for generated code, run before exec:
+    returns (code to execute, notes about rewrites) or raises CodeRejectedError.
+    """
+    try:
+        tree = ast.parse(code_snippet)
+    except SyntaxError as e:
+        raise CodeRejectedError(f"generated code is not valid Python ({e.msg}, line {e.lineno})")
+    
+    analyzer = PortalCostAnalyzer()
+    tree = ast.fix_missing_locations(analyzer.visit(tree))
+    analyzer.reject()
+    
+    notes = analyzer.notes + [f"estimated cost {analyzer.cost} portal call(s)"]
+    return ast.unparse(tree), notes
@@ -3,6 +3,9 @@
 echo "🚀 Starting ArcGIS Copilot Setup..."
 echo ""
 
+# Same default as launch.py, which warms this model below
+export OLLAMA_MODEL="${OLLAMA_MODEL:-llama3}"
+
 # Check if ollama command exists
 if ! command -v ollama &> /dev/null; then
     echo "❌ Ollama is NOT installed on this system"
@@ -25,25 +28,43 @@ if ! curl -s http://localhost:11434/api/tags > /dev/null 2>&1; then
     echo "✅ Ollama started with PID: $OLLAMA_PID"
     echo ""
     echo "⏳ Waiting for Ollama to be ready..."
-    sleep 3
+    OLLAMA_READY=0
+    for i in $(seq 1 60); do
+        if curl -s http://localhost:11434/api/tags > /dev/null 2>&1; then
+            OLLAMA_READY=1
+            break
+        fi
+        sleep 0.5
+    done
+    if [ "$OLLAMA_READY" -ne 1 ]; then
+        echo "❌ Ollama did not become ready within 30s - see /tmp/ollama.log"
+        exit 1
+    fi
+    echo "✅ Ollama server is ready"
 else
     echo "✅ Ollama server is already running"
 fi
 
-# Check if llama3 model is available
+# Check if the model is available
 echo ""
-echo "📥 Checking if llama3 model is available..."
-if ollama list | grep -q "llama3"; then
-    echo "✅ llama3 model found"
+echo "📥 Checking if $OLLAMA_MODEL model is available..."
+if ollama list | grep -q "$OLLAMA_MODEL"; then
+    echo "✅ $OLLAMA_MODEL model found"
 else
-    echo "⚠️  llama3 model not found, pulling it now..."
+    echo "⚠️  $OLLAMA_MODEL model not found, pulling it now..."
     echo "(This may take a few minutes...)"
-    ollama pull llama3
+    ollama pull "$OLLAMA_MODEL"
+fi
+
+# Preload the model so the first prompt doesn't pay the model load time
+cd /workspaces/arcgis-copilot-poc
+echo ""
+if ! python launch.py --warm-only; then
+    echo "⚠️  Model warm-up failed - the first prompt may be slow"
 fi
 
 # Start Streamlit app
 echo ""
 echo "🎬 Starting Streamlit app..."
 echo "📱 App will be available at: http://localhost:8501"
-cd /workspaces/arcgis-copilot-poc
 python -m streamlit run app.py --server.port 8501
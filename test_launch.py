@@ -0,0 +1,131 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import launch
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    """Minimal Ollama stand-in: /api/tags plus a streamed /api/generate"""
+
+    generate_status = 200
+    generate_chunks = [{"response": "Hi", "done": False}, {"response": "", "done": True}]
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/api/tags":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps({"models": [{"name": "llama3:latest"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests_seen.append(payload)
+        self.send_response(self.generate_status)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for chunk in self.generate_chunks:
+            self.wfile.write(json.dumps(chunk).encode() + b"\n")
+            self.wfile.flush()
+
+
+@pytest.fixture
+def stub_server():
+    handler = type("Handler", (StubOllama,), {"requests_seen": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dead_url():
+    """A localhost URL with nothing listening on it"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_wait_for_ollama_sees_a_ready_server(stub_server):
+    _, base_url = stub_server
+    assert launch.wait_for_ollama(base_url, timeout=2)
+
+
+def test_wait_for_ollama_times_out_without_a_server(dead_url):
+    assert not launch.wait_for_ollama(dead_url, timeout=0.3, interval=0.1)
+
+
+def test_warm_model_returns_time_to_first_token(stub_server):
+    handler, base_url = stub_server
+    ttft = launch.warm_model(base_url, model="llama3", keep_alive="45m")
+    assert ttft is not None and ttft >= 0
+    assert handler.requests_seen[0]["model"] == "llama3"
+    assert handler.requests_seen[0]["keep_alive"] == "45m"
+    assert handler.requests_seen[0]["stream"] is True
+
+
+def test_warm_model_fails_on_non_200(stub_server):
+    handler, base_url = stub_server
+    handler.generate_status = 404
+    handler.generate_chunks = [{"error": "model 'llama3' not found"}]
+    assert launch.warm_model(base_url, model="llama3") is None
+
+
+def test_warm_model_fails_on_error_chunk(stub_server):
+    handler, base_url = stub_server
+    handler.generate_chunks = [{"error": "out of memory"}]
+    assert launch.warm_model(base_url, model="llama3") is None
+
+
+def test_warm_model_fails_without_a_server(dead_url):
+    assert launch.warm_model(dead_url, model="llama3", timeout=1) is None
+
+
+def test_prepare_ollama_warms_a_ready_server(stub_server):
+    handler, base_url = stub_server
+    assert launch.prepare_ollama(base_url, model="llama3", keep_alive="30m", wait_timeout=2)
+    assert len(handler.requests_seen) == 1
+
+
+def test_prepare_ollama_fails_without_a_server(dead_url):
+    assert not launch.prepare_ollama(dead_url, model="llama3", wait_timeout=0.3)
+
+
+def test_wait_for_ollama_with_zero_timeout_probes_once(stub_server, dead_url):
+    _, base_url = stub_server
+    assert launch.wait_for_ollama(base_url, timeout=0)
+    started = time.monotonic()
+    assert not launch.wait_for_ollama(dead_url, timeout=0)
+    assert time.monotonic() - started < 0.5
+
+
+def test_plain_launch_fails_fast_without_a_server(dead_url, monkeypatch):
+    monkeypatch.setattr(launch, "OLLAMA_URL", dead_url)
+    monkeypatch.setattr(launch.sys, "argv", ["launch.py"])
+    monkeypatch.setattr(launch.subprocess, "run", lambda *args, **kwargs: None)
+    waits = []
+    real_prepare = launch.prepare_ollama
+    monkeypatch.setattr(
+        launch, "prepare_ollama",
+        lambda wait_timeout: waits.append(wait_timeout) or real_prepare(dead_url, wait_timeout=wait_timeout),
+    )
+    started = time.monotonic()
+    launch.main()
+    assert waits == [0]
+    assert time.monotonic() - started < 0.5
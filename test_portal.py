@@ -0,0 +1,264 @@
+import threading
+import time
+
+import pytest
+
+from portal import ItemPager, PortalClient, PortalUnavailableError
+
+
+class StubContent:
+    """Stand-in for gis.content whose search latency and failures the test controls"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, query, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("portal unreachable")
+        return [f"{query}-{i}" for i in range(kwargs.get("max_items", 1))]
+
+
+class StubPagedContent:
+    """Stand-in for gis.content.advanced_search over `total` numbered items"""
+
+    def __init__(self, total, delay=0.0):
+        self.total = total
+        self.delay = delay
+        self.fail = False
+        self.starts = []
+
+    def advanced_search(self, query, max_items, start):
+        self.starts.append(start)
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("portal unreachable")
+        end = min(start + max_items, self.total + 1)
+        return {"results": list(range(start, end)), "nextStart": end if end <= self.total else -1}
+
+
+class StubGIS:
+    def __init__(self, content):
+        self.content = content
+
+
+def make_client(content, **kwargs):
+    options = dict(deadline=0.3, hedge_after=0.1, failure_threshold=2, reset_timeout=0.2, max_workers=4)
+    options.update(kwargs)
+    return PortalClient(connect=lambda timeout: StubGIS(content), **options)
+
+
+def test_search_returns_results():
+    client = make_client(StubContent())
+    assert client.search("fire", max_items=2) == ["fire-0", "fire-1"]
+    assert client.snapshot()["successes"] == 1
+
+
+def test_slow_call_misses_deadline_and_falls_back():
+    client = make_client(StubContent(delay=1.0), hedge_after=1.0)
+    started = time.monotonic()
+    assert client.search("fire") == []
+    assert time.monotonic() - started < 0.6
+    metrics = client.snapshot()
+    assert metrics["timeouts"] == 1
+    assert metrics["abandoned"] == 1
+
+
+def test_slow_first_attempt_is_hedged():
+    content = StubContent()
+    first = threading.Event()
+
+    def search(query, **kwargs):
+        if not first.is_set():
+            first.set()
+            time.sleep(1.0)
+        return ["hedged"]
+
+    content.search = search
+    client = make_client(content)
+    assert client.search("fire") == ["hedged"]
+    assert client.snapshot()["hedged"] == 1
+
+
+def test_fast_failure_is_not_hedged():
+    content = StubContent(fail=True)
+    client = make_client(content)
+    assert client.search("fire") == []
+    assert content.calls == 1
+    assert client.snapshot()["hedged"] == 0
+
+
+def test_breaker_opens_and_short_circuits():
+    content = StubContent(fail=True)
+    client = make_client(content)
+    client.search("a")
+    client.search("b")
+    assert client.state == PortalClient.OPEN
+
+    started = time.monotonic()
+    with pytest.raises(PortalUnavailableError, match="circuit is open"):
+        client.call(lambda: "never runs")
+    assert time.monotonic() - started < 0.05
+    assert content.calls == 2
+    assert client.snapshot()["short_circuited"] == 1
+
+
+def test_half_open_lets_one_unhedged_trial_through_then_closes():
+    content = StubContent(fail=True)
+    client = make_client(content)
+    client.search("a")
+    client.search("b")
+    time.sleep(0.25)
+
+    content.fail = False
+    content.delay = 0.15
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.search("x"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(map(len, results)) == [0, 0, 1]
+    metrics = client.snapshot()
+    assert metrics["hedged"] == 0
+    assert metrics["state"] == PortalClient.CLOSED
+    assert metrics["transitions"] == {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1}
+    assert metrics["last_transition"]["transition"] == "half_open->closed"
+
+
+def test_failed_trial_reopens_breaker():
+    client = make_client(StubContent(fail=True))
+    client.search("a")
+    client.search("b")
+    time.sleep(0.25)
+    client.search("trial")
+    assert client.state == PortalClient.OPEN
+    assert client.snapshot()["transitions"]["half_open->open"] == 1
+
+
+def test_saturated_pool_fails_fast_instead_of_queuing():
+    release = threading.Event()
+    content = StubContent()
+    content.search = lambda query, **kwargs: release.wait(5) and []
+    client = make_client(content, max_workers=2, failure_threshold=10)
+
+    client.search("a")  # first attempt + hedge hold both workers
+    started = time.monotonic()
+    with pytest.raises(PortalUnavailableError, match="workers are busy"):
+        client.call(lambda: "queued")
+    assert time.monotonic() - started < 0.05
+    assert client.snapshot()["saturated"] == 1
+
+    release.set()
+    time.sleep(0.05)
+    assert client.snapshot()["in_flight"] == 0
+
+
+def test_background_call_is_skipped_while_breaker_is_not_closed():
+    client = make_client(StubContent(fail=True))
+    client.search("a")
+    client.search("b")
+    with pytest.raises(PortalUnavailableError, match="skipping prefetch"):
+        client.call_background(lambda: "never runs")
+
+
+def test_background_failures_do_not_open_breaker():
+    client = make_client(StubContent())
+
+    def boom():
+        raise ConnectionError("down")
+
+    for _ in range(5):
+        with pytest.raises(PortalUnavailableError):
+            client.call_background(boom)
+    metrics = client.snapshot()
+    assert metrics["state"] == PortalClient.CLOSED
+    assert metrics["background_failures"] == 5
+    assert metrics["failures"] == 0
+
+
+def drain(pager):
+    while pager.has_more:
+        pager.load_more()
+    return pager.items
+
+
+def test_pager_walks_every_page_in_order():
+    content = StubPagedContent(total=8, delay=0.02)
+    pager = ItemPager(make_client(content, deadline=1.0), "q", page_size=2)
+    assert drain(pager) == list(range(1, 9))
+    assert content.starts == [1, 3, 5, 7]
+
+
+def test_pager_serves_prefetched_page_from_buffer():
+    content = StubPagedContent(total=8)
+    client = make_client(content, deadline=1.0)
+    pager = ItemPager(client, "q", page_size=2)
+    pager.load_more()
+    time.sleep(0.1)
+    assert pager.load_more() == [3, 4]
+    assert client.snapshot()["calls"] == 1  # only the first page went through the foreground
+
+
+def test_pager_keeps_cursor_on_failure_and_retries():
+    content = StubPagedContent(total=4)
+    content.fail = True
+    pager = ItemPager(make_client(content, deadline=1.0, failure_threshold=10), "q", page_size=2)
+    assert pager.load_more() == []
+    assert pager.has_more
+    content.fail = False
+    assert pager.load_more() == [1, 2]
+
+
+def test_pager_skips_prefetch_while_breaker_is_open():
+    content = StubPagedContent(total=8)
+    client = make_client(content, deadline=1.0, failure_threshold=1, reset_timeout=60)
+    pager = ItemPager(client, "q", page_size=2)
+    pager.load_more()
+    time.sleep(0.05)  # page 2 is prefetched while the breaker is still closed
+    client.search("trip")  # StubPagedContent has no search(), so this trips the breaker
+    assert client.state == PortalClient.OPEN
+
+    assert pager.load_more() == [3, 4]
+    time.sleep(0.05)
+    assert content.starts == [1, 3]
+    assert pager.load_more() == []
+    assert pager.has_more
+
+
+def test_queued_prefetch_is_cancelled_and_fetched_in_foreground():
+    content = StubPagedContent(total=8)
+    client = make_client(content, deadline=1.0)
+    blocker = threading.Event()
+    for _ in range(2):  # occupy both prefetch workers so this session's prefetch queues
+        client.submit_background(blocker.wait, 5)
+    pager = ItemPager(client, "q", page_size=2)
+    pager.load_more()
+
+    started = time.monotonic()
+    assert pager.load_more() == [3, 4]
+    assert time.monotonic() - started < 0.2
+    blocker.set()
+
+
+def test_running_prefetch_wait_is_bounded_by_deadline():
+    content = StubPagedContent(total=8)
+    client = make_client(content, deadline=0.3)
+    pager = ItemPager(client, "q", page_size=2)
+    pager.load_more()
+    time.sleep(0.05)
+    content.delay = 1.0
+    assert pager.load_more() == [3, 4]  # served from buffer; kicks off a slow prefetch
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    assert pager.load_more() == []
+    assert time.monotonic() - started < 0.5
+    time.sleep(1.0)
+    assert pager.load_more() == [5, 6]
@@ -0,0 +1,135 @@
+import ast
+import os
+import re
+
+import pytest
+
+from preflight import CodeRejectedError, preflight_generated_code
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def mock_llm_snippets():
+    """Pull the template snippets out of MockLLM without importing the Streamlit app"""
+    tree = ast.parse(open(APP_PATH, encoding="utf-8").read())
+    mock_llm = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "MockLLM")
+    snippets = {}
+    for method in mock_llm.body:
+        if not (isinstance(method, ast.FunctionDef) and re.fullmatch(r"_generate_\w+_code", method.name)):
+            continue
+        for node in ast.walk(method):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                match = re.search(r"```python(.*?)```", node.value, re.DOTALL)
+                if match:
+                    snippets[method.name] = match.group(1).strip()
+    return snippets
+
+
+def test_constant_max_items_is_capped():
+    code, notes = preflight_generated_code("items = gis.content.search('x', max_items=10000)")
+    assert "max_items=25" in code
+    assert "max_items=10000 capped to 25" in notes
+
+
+def test_non_constant_max_items_is_wrapped_in_min():
+    code, notes = preflight_generated_code("items = gis.content.search('x', max_items=n)")
+    assert "max_items=min(n, 25)" in code
+    assert any("wrapped in min" in note for note in notes)
+
+
+def test_advanced_search_gets_a_cap_when_max_items_is_missing():
+    code, _ = preflight_generated_code("page = gis.content.advanced_search('x')")
+    assert "max_items=25" in code
+
+
+def test_per_feature_loop_is_rejected():
+    snippet = (
+        "fs = fl.query(where='1=1')\n"
+        "for f in fs.features:\n"
+        "    gis.content.search(f.attributes['name'])\n"
+    )
+    with pytest.raises(CodeRejectedError, match="per-feature loop"):
+        preflight_generated_code(snippet)
+
+
+def test_unbounded_while_loop_is_rejected():
+    with pytest.raises(CodeRejectedError, match="unbounded"):
+        preflight_generated_code("while True:\n    gis.content.search('x')\n")
+
+
+def test_download_is_rejected():
+    with pytest.raises(CodeRejectedError, match="download"):
+        preflight_generated_code("item = gis.content.get('abc')\nitem.download()\n")
+
+
+def test_invalid_python_is_rejected():
+    with pytest.raises(CodeRejectedError, match="not valid Python"):
+        preflight_generated_code("def (:")
+
+
+def test_gis_is_rewritten_to_the_shared_session():
+    code, notes = preflight_generated_code("gis = GIS('https://example.com', 'user', 'pass')")
+    assert code == "gis = portal_session()"
+    assert "GIS(...) rewritten to the shared portal session" in notes
+
+
+def test_positional_where_feature_query_is_capped():
+    code, _ = preflight_generated_code("fs = gis.content.get('abc').layers[0].query('1=1')")
+    assert "result_record_count=1000" in code
+    assert "return_all_records=False" in code
+
+
+def test_positional_where_on_named_layer_is_capped():
+    code, _ = preflight_generated_code("fl = item.layers[0]\nfs = fl.query('1=1')")
+    assert "fl.query('1=1', result_record_count=1000, return_all_records=False)" in code
+
+
+def test_return_all_records_true_is_disabled():
+    code, _ = preflight_generated_code("fs = fl.query(where='1=1', return_all_records=True)")
+    assert "return_all_records=False" in code
+
+
+def test_dataframe_query_is_left_alone():
+    snippet = "df = fs.sdf\nbig = df.query('POP > 1000')"
+    code, notes = preflight_generated_code(snippet)
+    assert "df.query('POP > 1000')" in code
+    assert "estimated cost 0 portal call(s)" in notes
+
+
+@pytest.mark.parametrize("name, cost", [
+    ("_generate_wildfire_code", 6),
+    ("_generate_weather_code", 1),
+    ("_generate_infrastructure_code", 1),
+    ("_generate_realestate_code", 1),
+    ("_generate_demographic_code", 1),
+])
+def test_mock_llm_snippets_pass_unchanged(name, cost):
+    snippet = mock_llm_snippets()[name]
+    code, notes = preflight_generated_code(snippet)
+    assert notes == ["GIS(...) rewritten to the shared portal session", f"estimated cost {cost} portal call(s)"]
+    assert code == ast.unparse(ast.parse(snippet)).replace("gis = GIS()", "gis = portal_session()")
+
+
+def test_content_get_in_unknown_loop_is_rejected():
+    with pytest.raises(CodeRejectedError, match="content.get called inside"):
+        preflight_generated_code("for i in ids:\n    gis.content.get(i)\n")
+
+
+def test_content_get_is_charged_but_dict_get_is_not():
+    _, notes = preflight_generated_code("item = gis.content.get('abc')\nname = options.get('name')")
+    assert "estimated cost 1 portal call(s)" in notes
+
+
+def test_literal_kwargs_splat_is_inlined_and_capped():
+    code, _ = preflight_generated_code("items = gis.content.search('x', **{'max_items': 10000})")
+    assert code == "items = gis.content.search('x', max_items=25)"
+
+
+def test_literal_kwargs_splat_on_advanced_search_gets_a_single_cap():
+    code, _ = preflight_generated_code("page = gis.content.advanced_search('x', **{'start': 1})")
+    assert code == "page = gis.content.advanced_search('x', start=1, max_items=25)"
+
+
+def test_dynamic_kwargs_splat_is_rejected():
+    with pytest.raises(CodeRejectedError, match=r"\*\*kwargs on .search\(\)"):
+        preflight_generated_code("items = gis.content.search('x', **options)")